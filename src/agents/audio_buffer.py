@@ -1,34 +1,44 @@
-import json
+import time
+from collections import OrderedDict, defaultdict, deque
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, Optional, Tuple
 
 
-@dataclass
+@dataclass(slots=True)
 class AudioEntry:
     """Represents a single audio message entry in the buffer."""
 
     message_id: int
     chat_id: int
     user_id: int
-    filepath: str
-    timestamp: datetime
+    file_id: str  # Telegram file_id, enough to download the audio again
+    timestamp_ns: int  # time.monotonic_ns() when the entry was added
     transcription: Optional[str] = None
+    summary: Optional[str] = None
     duration: Optional[float] = None
 
 
 class AudioBuffer:
-    def __init__(self, max_size: int = 100):
-        """Initialize the audio buffer with a maximum size."""
+    def __init__(self, max_size: int = 100, context_size: int = 3):
+        """
+        Initialize the audio buffer with a maximum size and the number of
+        transcriptions per chat kept as context for the next response.
+        """
         self.max_size = max_size
-        self.buffer: Dict[str, AudioEntry] = {}
+        # Entries are inserted chronologically, so insertion order is age order
+        self.buffer: "OrderedDict[str, AudioEntry]" = OrderedDict()
+        # Latest transcriptions of each chat as (entry key, context line), so a
+        # line can be dropped together with its entry
+        self._context: Dict[int, Deque[Tuple[str, str]]] = defaultdict(
+            lambda: deque(maxlen=context_size)
+        )
 
     def add_entry(
         self,
         message_id: int,
         chat_id: int,
         user_id: int,
-        filepath: str,
+        file_id: str,
         duration: Optional[float] = None,
     ) -> str:
         """
@@ -43,15 +53,16 @@ class AudioBuffer:
             message_id=message_id,
             chat_id=chat_id,
             user_id=user_id,
-            filepath=filepath,
-            timestamp=datetime.now(),
+            file_id=file_id,
+            timestamp_ns=time.monotonic_ns(),
             duration=duration,
         )
 
         # Add to buffer, removing oldest if at capacity
-        if len(self.buffer) >= self.max_size:
-            oldest_key = min(self.buffer.keys(), key=lambda k: self.buffer[k].timestamp)
-            del self.buffer[oldest_key]
+        if key in self.buffer:
+            self._drop_context(key, self.buffer.pop(key))
+        elif len(self.buffer) >= self.max_size:
+            self._drop_context(*self.buffer.popitem(last=False))
 
         self.buffer[key] = entry
         return key
@@ -60,31 +71,77 @@ class AudioBuffer:
         """Retrieve an entry from the buffer by its key."""
         return self.buffer.get(key)
 
-    def update_transcription(self, key: str, transcription: str) -> bool:
-        """Update the transcription for a specific entry."""
+    def update_transcription(
+        self, key: str, transcription: str, summary: Optional[str] = None
+    ) -> bool:
+        """
+        Update the transcription, and the summary if there is one, for a
+        specific entry. The summary stands in for a long transcription in the
+        chat's context.
+        """
         if key in self.buffer:
             entry = self.buffer[key]
             entry.transcription = transcription
+            entry.summary = summary
+            line = (key, f"user: {summary or transcription}")
+            context = self._context[entry.chat_id]
+            # An entry updated again keeps its one line, in its original place
+            for i, (line_key, _) in enumerate(context):
+                if line_key == key:
+                    context[i] = line
+                    break
+            else:
+                context.append(line)
             return True
         return False
 
+    def get_context_str(self, chat_id: int) -> str:
+        """Get the latest transcriptions of a chat as context lines, oldest first."""
+        context = self._context.get(chat_id)
+        return "\n".join(line for _, line in context) if context else ""
+
+    def _drop_context(self, key: str, entry: AudioEntry) -> None:
+        """Drop the context line of an entry leaving the buffer."""
+        context = self._context.get(entry.chat_id)
+        if context is None:
+            return
+        for item in context:
+            if item[0] == key:
+                context.remove(item)
+                break
+        if not context:
+            del self._context[entry.chat_id]
+
     def get_chat_history(self, chat_id: int, limit: int = 10) -> List[AudioEntry]:
         """Get recent audio entries for a specific chat."""
         chat_entries = [
             entry for entry in self.buffer.values() if entry.chat_id == chat_id
         ]
-        return sorted(chat_entries, key=lambda x: x.timestamp, reverse=True)[:limit]
+        return sorted(chat_entries, key=lambda x: x.timestamp_ns, reverse=True)[:limit]
+
+    def get_recent_transcriptions(self, chat_id: int, limit: int = 3) -> List[str]:
+        """Get the latest transcriptions for a specific chat, oldest first."""
+        recent: List[str] = []
+        # Walk newest to oldest and stop as soon as enough were found
+        for entry in reversed(self.buffer.values()):
+            if entry.chat_id == chat_id and entry.transcription:
+                recent.append(entry.transcription)
+                if len(recent) == limit:
+                    break
+        recent.reverse()
+        return recent
 
     def cleanup_old_entries(self, max_age_hours: int = 24) -> int:
         """Remove entries older than specified hours. Returns number of entries removed."""
-        current_time = datetime.now()
-        keys_to_remove = [
-            key
-            for key, entry in self.buffer.items()
-            if (current_time - entry.timestamp).total_seconds() > max_age_hours * 3600
-        ]
+        cutoff_ns = time.monotonic_ns() - max_age_hours * 3600 * 1_000_000_000
+        removed = 0
 
-        for key in keys_to_remove:
-            del self.buffer[key]
+        # Oldest entries come first, so stop at the first one still fresh
+        while self.buffer:
+            oldest = next(iter(self.buffer.values()))
+            if oldest.timestamp_ns >= cutoff_ns:
+                break
+            self._drop_context(*self.buffer.popitem(last=False))
+            removed += 1
 
-        return len(keys_to_remove)
+        return removed
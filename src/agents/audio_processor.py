@@ -1,86 +1,146 @@
 # src/agents/audio_processor.py
-import logging
-import os
-from datetime import datetime
-from typing import Any, Dict, Optional
+from __future__ import annotations
 
-from pydub import AudioSegment
-from telegram import Update, Voice
-from telegram.ext import ContextTypes
+import asyncio
+import logging
+import shutil
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from telegram import File, Update, Voice
+    from telegram.ext import ContextTypes
+
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Resolve ffmpeg once instead of walking $PATH on every conversion
+_FFMPEG = shutil.which("ffmpeg") or "ffmpeg"
+
+# Audio MIME types the Whisper API accepts without conversion, mapped to the
+# file extension that tells the API which format it is in
+_WHISPER_EXTENSIONS = {
+    "audio/flac": "flac",
+    "audio/x-flac": "flac",
+    "audio/m4a": "m4a",
+    "audio/mp4": "m4a",
+    "audio/x-m4a": "m4a",
+    "audio/mp3": "mp3",
+    "audio/mpeg": "mp3",
+    "audio/ogg": "ogg",
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/x-wav": "wav",
+    "audio/webm": "webm",
+}
+
+# Voice notes recorded in Telegram are OGG/Opus; assume so when none is given
+_DEFAULT_VOICE_MIME_TYPE = "audio/ogg"
+
+# Telegram guarantees a file's download link for at least one hour
+_FILE_CACHE_TTL_SECONDS = 3600
+_FILE_CACHE_MAX_SIZE = 1024
 
 
 class AudioProcessor:
-    def __init__(self, download_path: str = "downloads"):
-        """Initialize the audio processor with a download path."""
-        self.download_path = download_path
-        self.temp_path = os.path.join(download_path, "temp")
+    def __init__(self):
+        # file_id -> (File, monotonic time it was fetched)
+        self._file_cache: Dict[str, Tuple[File, float]] = {}
+        # Concurrent downloads of the same voice note share one request
+        self._downloads = SingleFlight()
 
-        # Create necessary directories
-        os.makedirs(download_path, exist_ok=True)
-        os.makedirs(self.temp_path, exist_ok=True)
+    async def _get_file(self, context: ContextTypes.DEFAULT_TYPE, file_id: str) -> File:
+        """
+        Return the Telegram File for a file_id, reusing a recent getFile result
+        so repeated downloads of the same voice note skip that round-trip.
+        """
+        now = time.monotonic()
+        cached = self._file_cache.get(file_id)
+        if cached and now - cached[1] < _FILE_CACHE_TTL_SECONDS:
+            return cached[0]
+
+        file = await context.bot.get_file(file_id)
+        self._file_cache.pop(file_id, None)
+        if len(self._file_cache) >= _FILE_CACHE_MAX_SIZE:
+            # Dicts keep insertion order, so the first entry is the oldest
+            del self._file_cache[next(iter(self._file_cache))]
+        self._file_cache[file_id] = (file, now)
+        return file
+
+    async def _download(self, context: ContextTypes.DEFAULT_TYPE, file_id: str) -> bytes:
+        file = await self._get_file(context, file_id)
+        return bytes(await file.download_as_bytearray())
 
     async def download_voice_message(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
-    ) -> Optional[str]:
+    ) -> Optional[bytes]:
         """
-        Download a voice message from Telegram and convert it to MP3 format.
-        Returns the path to the converted MP3 file or None if download/conversion fails.
+        Download a voice message from Telegram into memory as-is (OGG/Opus,
+        which Whisper accepts).
+        Returns the audio data or None if the download fails.
         """
         try:
-            if not update.message or not update.message.voice:
+            message = update.message
+            voice: Optional[Voice] = message.voice if message else None
+            if not voice:
                 return None
 
-            voice: Voice = update.message.voice
-            file = await context.bot.get_file(voice.file_id)
-
-            # Generate filenames
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            msg_id = update.message.message_id
-
-            # Temporary OGG file path
-            ogg_filename = f"voice_{timestamp}_{msg_id}.ogg"
-            ogg_filepath = os.path.join(self.temp_path, ogg_filename)
-
-            # Final MP3 file path
-            mp3_filename = f"voice_{timestamp}_{msg_id}.mp3"
-            mp3_filepath = os.path.join(self.download_path, mp3_filename)
-
-            # Download the OGG file
-            await file.download_to_drive(ogg_filepath)
+            audio_data = await self._downloads.run(
+                voice.file_unique_id, self._download, context, voice.file_id
+            )
 
-            # Convert OGG to MP3
-            audio = AudioSegment.from_ogg(ogg_filepath)
-            audio.export(mp3_filepath, format="mp3")
+            logger.info("Successfully downloaded voice message: %s", voice.file_id)
+            return audio_data
 
-            # Clean up the temporary OGG file
-            os.remove(ogg_filepath)
+        except Exception as e:
+            logger.error("Error processing voice message: %s", e, exc_info=True)
+            return None
 
-            logging.info(f"Successfully converted voice message to MP3: {mp3_filepath}")
-            return mp3_filepath
+    @staticmethod
+    def whisper_filename(mime_type: Optional[str]) -> Optional[str]:
+        """
+        Get the filename to upload audio of the given MIME type to Whisper as,
+        or None if Whisper does not accept the format and it must be converted.
+        """
+        media_type = (mime_type or _DEFAULT_VOICE_MIME_TYPE).split(";", 1)[0]
+        extension = _WHISPER_EXTENSIONS.get(media_type.strip().lower())
+        return f"voice.{extension}" if extension else None
 
-        except Exception as e:
-            logging.error(f"Error processing voice message: {str(e)}", exc_info=True)
-            # Clean up any temporary files if they exist
-            if "ogg_filepath" in locals() and os.path.exists(ogg_filepath):
-                os.remove(ogg_filepath)
+    async def convert_to_mp3(self, audio_data: bytes) -> Optional[bytes]:
+        """
+        Convert audio data to MP3 by piping it through ffmpeg's stdin and
+        reading the encoded output from its stdout. Only needed for formats
+        Whisper does not accept.
+        Returns the MP3 data or None if the conversion fails.
+        """
+        process = await asyncio.create_subprocess_exec(
+            _FFMPEG,
+            "-y",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-i",
+            "pipe:0",
+            "-threads",
+            "1",
+            "-f",
+            "mp3",
+            "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            mp3_data, stderr = await process.communicate(input=audio_data)
+        except asyncio.CancelledError:
+            # Do not leave ffmpeg running when the caller gives up, e.g. on timeout
+            process.kill()
+            raise
+
+        if process.returncode != 0:
+            logger.error("ffmpeg conversion failed: %s", stderr.decode(errors="replace"))
             return None
 
-    def cleanup_old_files(self, max_age_hours: int = 24) -> int:
-        """Clean up old audio files. Returns number of files removed."""
-        current_time = datetime.now()
-        files_removed = 0
-
-        for directory in [self.download_path, self.temp_path]:
-            for filename in os.listdir(directory):
-                filepath = os.path.join(directory, filename)
-                file_time = datetime.fromtimestamp(os.path.getctime(filepath))
-
-                if (current_time - file_time).total_seconds() > max_age_hours * 3600:
-                    try:
-                        os.remove(filepath)
-                        files_removed += 1
-                        logging.info(f"Removed old audio file: {filepath}")
-                    except Exception as e:
-                        logging.error(f"Error removing file {filepath}: {str(e)}")
-
-        return files_removed
+        logger.info("Successfully converted audio to MP3")
+        return mp3_data
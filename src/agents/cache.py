@@ -0,0 +1,49 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Optional, Tuple
+
+
+@dataclass(slots=True, frozen=True)
+class CachedResult:
+    """Everything the pipeline produced for one voice message."""
+
+    transcription: str
+    language: str
+    summary: Optional[str] = None  # None when the message was short enough to send as-is
+    response: Optional[str] = None
+
+    @property
+    def reply(self) -> str:
+        """The text that was sent back to the user."""
+        return self.response or self.transcription
+
+
+class ResultCache:
+    def __init__(self, ttl_seconds: float, max_size: int = 1024):
+        """Initialize the cache with an entry lifetime and a maximum size."""
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        # Least recently used entries come first
+        self._entries: "OrderedDict[Hashable, Tuple[CachedResult, float]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[CachedResult]:
+        """Get the result stored for a key, or None if missing or expired."""
+        item = self._entries.get(key)
+        if item is None:
+            return None
+
+        result, stored_at = item
+        if time.monotonic() - stored_at >= self.ttl_seconds:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return result
+
+    def put(self, key: Hashable, result: CachedResult) -> None:
+        """Store a result, evicting the least recently used one when full."""
+        self._entries.pop(key, None)
+        if len(self._entries) >= self.max_size:
+            self._entries.popitem(last=False)
+        self._entries[key] = (result, time.monotonic())
@@ -0,0 +1,67 @@
+# src/agents/digest_handler.py
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, List, Set
+
+if TYPE_CHECKING:
+    from telegram import Message, Update
+    from telegram.ext import ContextTypes
+
+from .audio_buffer import AudioBuffer
+from .responder import Responder
+
+logger = logging.getLogger(__name__)
+
+# Number of recent voice messages of the chat covered by a digest
+_DIGEST_MAX_MESSAGES = 20
+
+_NO_MESSAGES_TEXT = "🤷 There are no voice messages to recap yet."
+_DIGEST_REQUESTED_TEXT = "📝 Preparing your digest. This can take a while, I'll update this message when it's ready."
+_DIGEST_FAILED_TEXT = "❌ Sorry, I couldn't prepare your digest. Please try again."
+
+
+class DigestCommandHandler:
+    def __init__(self, audio_buffer: AudioBuffer, responder: Responder):
+        self.audio_buffer = audio_buffer
+        self.responder = responder
+        # Digests still waiting for their batch, cancelled when the bot stops
+        self._pending_digests: Set[asyncio.Task] = set()
+
+    async def handle_digest_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle the /digest command with a recap of the chat's recent voice messages."""
+        message = update.message
+        if not message:
+            return
+
+        transcriptions = self.audio_buffer.get_recent_transcriptions(
+            message.chat_id, limit=_DIGEST_MAX_MESSAGES
+        )
+        if not transcriptions:
+            await message.reply_text(_NO_MESSAGES_TEXT)
+            return
+
+        status_msg = await message.reply_text(_DIGEST_REQUESTED_TEXT)
+
+        # The batch can take hours, so wait for it outside of update processing.
+        # Application.create_task is not used: stopping the bot would wait for it.
+        task = asyncio.create_task(self._send_digest(status_msg, transcriptions))
+        self._pending_digests.add(task)
+        task.add_done_callback(self._pending_digests.discard)
+
+    async def cancel_pending(self) -> None:
+        """Cancel the digests still waiting for their batch and wait until they stop."""
+        tasks = list(self._pending_digests)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if tasks:
+            logger.info("Cancelled %d pending digest(s)", len(tasks))
+
+    async def _send_digest(self, status_msg: Message, transcriptions: List[str]) -> None:
+        digest = await self.responder.generate_digest(transcriptions)
+        try:
+            await status_msg.edit_text(digest or _DIGEST_FAILED_TEXT)
+        except Exception as e:
+            logger.error("Error sending digest: %s", e)
@@ -1,13 +1,60 @@
 # src/agents/message_handler.py
+from __future__ import annotations
+
+import asyncio
 import logging
-from typing import Optional, Tuple
-from telegram import Update
-from telegram.ext import ContextTypes
+from typing import TYPE_CHECKING, Awaitable, Optional, Tuple, TypeVar
+
+from telegram_utils.status_updater import StatusUpdater
+
+if TYPE_CHECKING:
+    from telegram import Message, Update, Voice
+    from telegram.ext import ContextTypes
 
 from .audio_processor import AudioProcessor
 from .audio_buffer import AudioBuffer
+from .cache import CachedResult, ResultCache
 from .summarizer import Summarizer
-from .responder import Responder
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Whisper reports either an ISO code or the full language name
+_ENGLISH_LANGUAGES = frozenset({"en", "english"})
+
+# Limits checked before anything is downloaded. Bots cannot download files
+# larger than 20 MB, and long recordings are not worth transcribing.
+_MAX_VOICE_SECONDS = 600
+_MAX_VOICE_FILE_SIZE = 20 * 1024 * 1024
+
+# Voice notes up to this length are processed quickly enough that intermediate
+# status edits only cost Telegram round-trips; they get the final edit only.
+_SHORT_VOICE_SECONDS = 15
+
+# Transcriptions shorter than this are sent back as-is: summarizing a few
+# sentences adds two model calls without making the message any shorter.
+_SHORT_MESSAGE_WORD_COUNT = 100
+# Scripts written without spaces (Chinese, Japanese, Thai) look like a single
+# word, so the length in characters is capped as well.
+_SHORT_MESSAGE_MAX_CHARS = 600
+
+# Time budget of each pipeline stage, retries included. A stuck request fails
+# the message instead of holding a rate limiter slot indefinitely.
+_DOWNLOAD_TIMEOUT_SECONDS = 20
+_TRANSCRIBE_TIMEOUT_SECONDS = 45
+_ANALYZE_TIMEOUT_SECONDS = 30
+
+_PROCESSING_TEXT = "🎧 Processing your voice message..."
+_TRANSCRIBING_TEXT = "🔍 Transcribing your message..."
+_ANALYZING_TEMPLATE = "{emoji} Analyzing your message in {language}..."
+
+_TOO_LONG_TEXT = "❌ Sorry, this voice message is too long for me to process."
+_DOWNLOAD_FAILED_TEXT = "❌ Sorry, I couldn't process your voice message. Please try again."
+_TRANSCRIPTION_FAILED_TEXT = "❌ Sorry, I couldn't transcribe your message. Please try again."
+_SUMMARY_FAILED_TEXT = "❌ Sorry, I couldn't analyze your message. Please try again."
+_UNEXPECTED_ERROR_TEXT = "❌ Sorry, something went wrong. Please try again later."
+
 
 class VoiceMessageHandler:
     def __init__(
@@ -15,101 +62,190 @@ class VoiceMessageHandler:
         audio_processor: AudioProcessor,
         audio_buffer: AudioBuffer,
         summarizer: Summarizer,
-        responder: Responder
+        result_cache: ResultCache,
     ):
         self.audio_processor = audio_processor
         self.audio_buffer = audio_buffer
         self.summarizer = summarizer
-        self.responder = responder
+        self.result_cache = result_cache
+
+    @staticmethod
+    async def _run_stage(
+        stage: str, timeout: float, coro: Awaitable[Optional[T]]
+    ) -> Optional[T]:
+        """Await a pipeline stage within its time budget. Returns None if it ran out."""
+        try:
+            async with asyncio.timeout(timeout):
+                return await coro
+        except TimeoutError:
+            logger.warning("%s timed out after %s seconds", stage, timeout)
+            return None
+
+    async def _transcribe(self, voice: Voice, audio_data: bytes) -> Optional[Tuple[str, str]]:
+        """
+        Transcribe audio and detect language. Voice notes are sent as-is;
+        only formats Whisper does not accept are re-encoded first.
+        """
+        filename = self.audio_processor.whisper_filename(voice.mime_type)
+        if filename is None:
+            audio_data = await self.audio_processor.convert_to_mp3(audio_data)
+            if not audio_data:
+                return None
+            filename = "voice.mp3"
+
+        return await self.summarizer.transcribe_audio(
+            audio_data,
+            filename=filename,
+            cache_key=voice.file_unique_id,
+        )
 
     async def handle_voice_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle incoming voice messages."""
+        processing_msg: Optional[Message] = None
         try:
-            if not update.message or not update.message.voice:
-                return
-
-            chat_id = update.message.chat_id
-            message_id = update.message.message_id
-            
-            # Send initial processing message
-            processing_msg = await update.message.reply_text(
-                "🎧 Processing your voice message..."
-            )
-
-            # Download and convert audio
-            audio_path = await self.audio_processor.download_voice_message(update, context)
-            if not audio_path:
-                await processing_msg.edit_text(
-                    "❌ Sorry, I couldn't process your voice message. Please try again."
-                )
-                return
-
-            # Store in buffer
-            buffer_key = self.audio_buffer.add_entry(
-                message_id=message_id,
-                chat_id=chat_id,
-                user_id=update.message.from_user.id,
-                filepath=audio_path,
-                duration=update.message.voice.duration
-            )
-
-            # Update processing status
-            await processing_msg.edit_text("🔍 Transcribing your message...")
-
-            # Transcribe audio and detect language
-            transcription_result = await self.summarizer.transcribe_audio(audio_path)
-            if not transcription_result:
-                await processing_msg.edit_text(
-                    "❌ Sorry, I couldn't transcribe your message. Please try again."
+            # Status edits run in this group: leaving it waits for every scheduled
+            # edit, and an error or cancellation in the pipeline cancels them
+            async with asyncio.TaskGroup() as status_updates:
+                message = update.message
+                voice = message.voice if message else None
+                if not voice:
+                    return
+
+                chat_id = message.chat_id
+                message_id = message.message_id
+
+                # Reject oversized voice messages before any download or API work
+                if (voice.duration or 0) > _MAX_VOICE_SECONDS or (
+                    voice.file_size or 0
+                ) > _MAX_VOICE_FILE_SIZE:
+                    await message.reply_text(_TOO_LONG_TEXT)
+                    return
+
+                # A repeat of a voice message in the same chat is answered without
+                # downloading it again. file_unique_id is the same for every copy
+                # of the file; the chat is part of the key because the summary and
+                # topics depend on that chat's earlier messages.
+                cache_key = (chat_id, voice.file_unique_id)
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    buffer_key = self.audio_buffer.add_entry(
+                        message_id=message_id,
+                        chat_id=chat_id,
+                        user_id=message.from_user.id,
+                        file_id=voice.file_id,
+                        duration=voice.duration
+                    )
+                    self.audio_buffer.update_transcription(
+                        buffer_key, cached.transcription, cached.summary
+                    )
+                    await message.reply_text(cached.reply)
+                    return
+
+                # Send initial processing message
+                processing_msg = await message.reply_text(_PROCESSING_TEXT)
+                status = StatusUpdater(processing_msg, status_updates)
+
+                # A voice note transcribed before, e.g. one forwarded from another
+                # chat, needs neither a download nor a Whisper call
+                transcription_result = self.summarizer.get_cached_transcription(
+                    voice.file_unique_id
                 )
-                return
-
-            transcription, detected_language = transcription_result
-            
-            # Update processing status with detected language
-            language_emoji = "🌐" if detected_language != "en" else "🇬🇧"
-            await processing_msg.edit_text(
-                f"{language_emoji} Analyzing your message in {detected_language}..."
-            )
-
-            # Summarize transcription
-            summary = await self.summarizer.summarize_transcription(
-                transcription, 
-                detected_language
-            )
-            if not summary:
-                await processing_msg.edit_text(
-                    "❌ Sorry, I couldn't analyze your message. Please try again."
+
+                # Download audio
+                audio_data = None
+                if transcription_result is None:
+                    audio_data = await self._run_stage(
+                        "Download",
+                        _DOWNLOAD_TIMEOUT_SECONDS,
+                        self.audio_processor.download_voice_message(update, context),
+                    )
+                    if not audio_data:
+                        status.finish(_DOWNLOAD_FAILED_TEXT)
+                        return
+
+                # Store in buffer
+                buffer_key = self.audio_buffer.add_entry(
+                    message_id=message_id,
+                    chat_id=chat_id,
+                    user_id=message.from_user.id,
+                    file_id=voice.file_id,
+                    duration=voice.duration
                 )
-                return
-
-            # Get chat history from buffer
-            chat_history = self.audio_buffer.get_chat_history(chat_id)
-            
-            # Generate response
-            response = await self.responder.generate_response(
-                summary=summary,
-                context=[
-                    {"role": "user", "content": entry.transcription}
-                    for entry in chat_history if entry.transcription
-                ]
-            )
-
-            if not response:
-                await processing_msg.edit_text(
-                    "❌ Sorry, I couldn't generate a response. Please try again."
+
+                show_progress = (voice.duration or 0) > _SHORT_VOICE_SECONDS
+
+                # Transcribe audio and detect language
+                if transcription_result is None:
+                    # Update processing status while transcription starts
+                    if show_progress:
+                        status.update(_TRANSCRIBING_TEXT)
+
+                    transcription_result = await self._run_stage(
+                        "Transcription",
+                        _TRANSCRIBE_TIMEOUT_SECONDS,
+                        self._transcribe(voice, audio_data),
+                    )
+                    if not transcription_result:
+                        status.finish(_TRANSCRIPTION_FAILED_TEXT)
+                        return
+
+                transcription, detected_language = transcription_result
+                if not transcription.strip():
+                    status.finish(_TRANSCRIPTION_FAILED_TEXT)
+                    return
+
+                # Short messages only need the transcription. Counting spaces is a
+                # close enough word count and avoids splitting the whole text.
+                if (
+                    len(transcription) < _SHORT_MESSAGE_MAX_CHARS
+                    and transcription.count(" ") + 1 < _SHORT_MESSAGE_WORD_COUNT
+                ):
+                    self.audio_buffer.update_transcription(buffer_key, transcription)
+                    self.result_cache.put(
+                        cache_key,
+                        CachedResult(transcription, detected_language),
+                    )
+                    status.finish(transcription)
+                    return
+
+                # Update processing status with detected language
+                if show_progress:
+                    language_emoji = (
+                        "🇬🇧" if detected_language.lower() in _ENGLISH_LANGUAGES else "🌐"
+                    )
+                    status.update(
+                        _ANALYZING_TEMPLATE.format(
+                            emoji=language_emoji, language=detected_language
+                        )
+                    )
+
+                # Summarize transcription and generate the response in one call
+                analysis = await self._run_stage(
+                    "Analysis",
+                    _ANALYZE_TIMEOUT_SECONDS,
+                    self.summarizer.summarize_and_respond(
+                        transcription,
+                        detected_language,
+                        context_str=self.audio_buffer.get_context_str(chat_id),
+                    ),
                 )
-                return
+                if not analysis:
+                    status.finish(_SUMMARY_FAILED_TEXT)
+                    return
 
-            # Update the transcription in buffer
-            self.audio_buffer.update_transcription(buffer_key, transcription)
+                summary, response = analysis
+
+                # Update the transcription in buffer and remember the result
+                self.audio_buffer.update_transcription(buffer_key, transcription, summary)
+                self.result_cache.put(
+                    cache_key,
+                    CachedResult(transcription, detected_language, summary, response),
+                )
 
-            # Send final response
-            await processing_msg.edit_text(response)
+                # Send final response
+                status.finish(response)
 
         except Exception as e:
-            logging.error(f"Error processing voice message: {str(e)}", exc_info=True)
-            if 'processing_msg' in locals():
-                await processing_msg.edit_text(
-                    "❌ Sorry, something went wrong. Please try again later."
-                )
\ No newline at end of file
+            logger.error("Error processing voice message: %s", e, exc_info=True)
+            if processing_msg is not None:
+                await processing_msg.edit_text(_UNEXPECTED_ERROR_TEXT)
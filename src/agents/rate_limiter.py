@@ -0,0 +1,32 @@
+# src/agents/rate_limiter.py
+import asyncio
+
+
+class RateLimiter:
+    """
+    Async context manager that caps the number of in-flight requests and
+    spaces out request starts to stay under a requests-per-second budget.
+    """
+
+    def __init__(self, requests_per_second: float, max_concurrency: int):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._min_interval = 1 / requests_per_second
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        try:
+            async with self._lock:
+                loop = asyncio.get_running_loop()
+                wait = self._next_start - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_start = loop.time() + self._min_interval
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
@@ -1,60 +1,116 @@
 # src/agents/responder.py
+from __future__ import annotations
+
+import asyncio
+import json
 import logging
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+_DIGEST_PROMPT = (
+    "Write a digest of the voice messages you will be provided, one per line, "
+    "as an unordered list of the topics they cover. "
+    "Your answer must be in the language used in the messages."
+)
 
-from openai import OpenAI
+# Batch jobs take minutes to hours, so there is no point in polling more often
+_BATCH_POLL_SECONDS = 60
+_BATCH_FINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
 
 
 class Responder:
-    """Agent responsible for generating responses based on summaries and context."""
+    """Agent responsible for generating digests of a chat's voice messages."""
 
-    def __init__(self, openai_client: OpenAI):
+    def __init__(self, openai_client: AsyncOpenAI):
         self.client = openai_client
 
-    async def generate_response(
-        self, summary: str, context: List[Dict[str, str]] = None
-    ) -> Optional[str]:
-        """Generate response considering summary and previous context."""
+    async def generate_digest(self, transcriptions: List[str]) -> Optional[str]:
+        """
+        Generate a digest of several transcriptions through the Batch API,
+        which costs half as much as an interactive request and does not use
+        its rate limits, but may take up to 24 hours to complete.
+        """
+        # Files left in the account's storage once the digest is done with them
+        file_ids: List[str] = []
+        batch = None
         try:
-            # Prepare context from previous interactions
-            context_str = ""
-            if context:
-                context_str = "\n".join(
-                    [
-                        f"{msg['role']}: {msg['content']}"
-                        for msg in context[-3:]  # Last 3 messages
-                    ]
-                )
-
-            messages = [
-                {
-                    "role": "system",
-                    "content": (
-                        "Generate an unordered list of topics included in the summary you will have been provided."
-                        "Your answer must be in the language used in the summary."
-                    ),
-                }
-            ]
-
-            if context_str:
-                messages.append(
-                    {
-                        "role": "user",
-                        "content": f"Previous context:\n{context_str}\n\nCurrent message summary:\n{summary}",
-                    }
-                )
-            else:
-                messages.append(
-                    {"role": "user", "content": f"Current message summary:\n{summary}"}
-                )
-
-            response = self.client.chat.completions.create(  # Removed await
-                model="gpt-4o-mini", messages=messages
+            request = {
+                "custom_id": "digest",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": "gpt-4o-mini",
+                    "messages": [
+                        {"role": "system", "content": _DIGEST_PROMPT},
+                        {"role": "user", "content": "\n".join(transcriptions)},
+                    ],
+                },
+            }
+            input_file = await self.client.files.create(
+                file=("digest.jsonl", json.dumps(request).encode() + b"\n"),
+                purpose="batch",
             )
+            file_ids.append(input_file.id)
+            batch = await self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+            logger.info("Created digest batch: %s", batch.id)
+
+            batch = await self._wait_for_batch(batch)
+            file_ids.extend(
+                file_id for file_id in (batch.output_file_id, batch.error_file_id) if file_id
+            )
+
+            if batch.status != "completed" or not batch.output_file_id:
+                logger.error("Digest batch %s ended as %s", batch.id, batch.status)
+                return None
 
-            logging.info("Successfully generated response")
-            return response.choices[0].message.content
+            output = await self.client.files.content(batch.output_file_id)
+            result = json.loads(output.text.splitlines()[0])
+            logger.info("Successfully generated digest")
+            return result["response"]["body"]["choices"][0]["message"]["content"]
+
+        except asyncio.CancelledError:
+            # Nobody is waiting for the result any more, so stop paying for it
+            if batch is not None and batch.status not in _BATCH_FINAL_STATUSES:
+                await self._cancel_batch(batch.id)
+            raise
 
         except Exception as e:
-            logging.error(f"Error generating response: {str(e)}", exc_info=True)
+            logger.error("Error generating digest: %s", e, exc_info=True)
             return None
+
+        finally:
+            await self._delete_files(file_ids)
+
+    async def _wait_for_batch(self, batch):
+        """Poll a batch until it reaches a final status and return it."""
+        while batch.status not in _BATCH_FINAL_STATUSES:
+            await asyncio.sleep(_BATCH_POLL_SECONDS)
+            try:
+                batch = await self.client.batches.retrieve(batch.id)
+            except Exception as e:
+                # The batch keeps running whether or not this poll succeeds, so
+                # retry at the next interval rather than abandon it
+                logger.warning("Error polling digest batch %s: %s", batch.id, e)
+        return batch
+
+    async def _cancel_batch(self, batch_id: str) -> None:
+        try:
+            await self.client.batches.cancel(batch_id)
+            logger.info("Cancelled digest batch: %s", batch_id)
+        except Exception as e:
+            logger.warning("Error cancelling digest batch %s: %s", batch_id, e)
+
+    async def _delete_files(self, file_ids: List[str]) -> None:
+        for file_id in file_ids:
+            try:
+                await self.client.files.delete(file_id)
+            except Exception as e:
+                logger.warning("Error deleting digest file %s: %s", file_id, e)
@@ -0,0 +1,46 @@
+# src/agents/single_flight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one: the first caller
+    does the work and everyone arriving while it runs awaits the same result.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(
+        self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            try:
+                # Shield the shared future so a cancelled waiter does not
+                # cancel the work for everyone else
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The caller doing the work was cancelled, not this one
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    return await fn(*args, **kwargs)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
@@ -1,71 +1,187 @@
 # src/agents/summarizer.py
+from __future__ import annotations
+
+import json
 import logging
-from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .rate_limiter import RateLimiter
+from .single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Number of (transcription, language) results kept for repeat voice notes
+_TRANSCRIPTION_CACHE_SIZE = 1024
+
+# Whisper answers only once the whole file is transcribed, so the read timeout
+# caps processing time. It overrides the client's short per-attempt timeout and
+# stays just inside the handler's 45 s transcription budget.
+_TRANSCRIPTION_TIMEOUT_SECONDS = 40.0
 
-from openai import OpenAI
+_SUMMARY_SYSTEM_TMPL = """You are an expert at summarizing spoken conversations. Your task is to create a clear, concise summary of audio transcripts while:
 
+1. Capturing the essential meaning and key points
+2. Maintaining the original tone and language of the speaker
+3. Preserving important details, numbers, or specific references
+4. Keeping the summary to 2-3 sentences maximum
+5. Using natural, conversational language that reflects spoken communication
+
+Remember this is transcribed speech, so focus on the core message rather than exact wording. If the transcript contains filler words or speech artifacts, distill the actual meaning.
+The detected language of this audio is: %s
+
+You may also be given previous messages of the conversation as context. Only summarize the current message, but use the context to list the topics it covers, in the same language as the message.
+Answer with a JSON object of the form {"summary": "<summary>", "topics": ["<topic>", ...]}."""
+
+# Structured output for the summary completion, so the model can only answer
+# with a summary string and a list of topic strings
+_SUMMARY_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "voice_message_summary",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "summary": {"type": "string"},
+                "topics": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["summary", "topics"],
+            "additionalProperties": False,
+        },
+    },
+}
 
 class Summarizer:
     """Agent responsible for transcription and summarization of audio content."""
 
-    def __init__(self, openai_client: OpenAI):
+    def __init__(
+        self,
+        openai_client: AsyncOpenAI,
+        transcription_limiter: RateLimiter,
+        chat_limiter: RateLimiter,
+    ):
         self.client = openai_client
+        self.transcription_limiter = transcription_limiter
+        self.chat_limiter = chat_limiter
+        # LRU of cache_key -> (transcription, detected_language). A transcription
+        # does not depend on the chat, so forwards into other chats reuse it.
+        self._transcriptions: OrderedDict[str, Tuple[str, str]] = OrderedDict()
+        # Concurrent requests for the same cache_key share one transcription
+        self._inflight_transcriptions = SingleFlight()
 
-    async def transcribe_audio(self, audio_path: str) -> Optional[Tuple[str, str]]:
+    def get_cached_transcription(self, cache_key: str) -> Optional[Tuple[str, str]]:
+        """Get the (transcription, detected_language) stored for a cache_key, if any."""
+        cached = self._transcriptions.get(cache_key)
+        if cached is not None:
+            self._transcriptions.move_to_end(cache_key)
+        return cached
+
+    async def transcribe_audio(
+        self,
+        audio_data: bytes,
+        filename: str = "voice.ogg",
+        cache_key: Optional[str] = None,
+    ) -> Optional[Tuple[str, str]]:
         """
-        Transcribe audio file using Whisper.
+        Transcribe in-memory audio data using Whisper.
+        `filename` tells the API which format the audio is in. When a
+        `cache_key` (e.g. Telegram's file_unique_id) is given, a repeat of the
+        same audio is answered from cache without calling the API, and
+        concurrent calls with the same key share a single request.
         Returns a tuple of (transcription, detected_language) or None if failed.
         """
+        if cache_key is not None:
+            cached = self.get_cached_transcription(cache_key)
+            if cached is not None:
+                logger.info("Using cached transcription: %s", cache_key)
+                return cached
+            return await self._inflight_transcriptions.run(
+                cache_key, self._transcribe, audio_data, filename, cache_key
+            )
+
+        return await self._transcribe(audio_data, filename, cache_key)
+
+    async def _transcribe(
+        self, audio_data: bytes, filename: str, cache_key: Optional[str]
+    ) -> Optional[Tuple[str, str]]:
         try:
-            with open(audio_path, "rb") as audio_file:
-                transcript = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    response_format="verbose_json",
-                    prompt=None,  # Get additional info including language
-                )
+            transcript = await self._create_transcription((filename, audio_data))
 
             detected_language = transcript.language
             text = transcript.text
 
-            logging.info(f"Successfully transcribed audio: {audio_path}")
-            logging.info(f"Detected language: {detected_language}")
+            logger.info("Successfully transcribed audio: %s", filename)
+            logger.info("Detected language: %s", detected_language)
+
+            if cache_key is not None:
+                self._transcriptions[cache_key] = (text, detected_language)
+                if len(self._transcriptions) > _TRANSCRIPTION_CACHE_SIZE:
+                    self._transcriptions.popitem(last=False)
 
             return text, detected_language
 
         except Exception as e:
-            logging.error(f"Error transcribing audio: {str(e)}", exc_info=True)
+            logger.error("Error transcribing audio: %s", e, exc_info=True)
             return None
 
-    async def summarize_transcription(
-        self, transcription: str, language: str
-    ) -> Optional[str]:
-        """Summarize transcription using GPT."""
+    async def _create_transcription(self, file):
+        """Send audio to Whisper, requesting verbose output with the language."""
+        async with self.transcription_limiter:
+            return await self.client.with_options(
+                timeout=_TRANSCRIPTION_TIMEOUT_SECONDS
+            ).audio.transcriptions.create(
+                model="whisper-1",
+                file=file,
+                response_format="verbose_json",
+                prompt=None,  # Get additional info including language
+            )
+
+    async def _create_chat_completion(self, messages, **kwargs):
+        """Request a chat completion within the chat rate limit."""
+        async with self.chat_limiter:
+            return await self.client.chat.completions.create(
+                model="gpt-4o-mini", messages=messages, **kwargs
+            )
+
+    async def summarize_and_respond(
+        self, transcription: str, language: str, context_str: str = ""
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Summarize a transcription and list its topics in a single completion.
+        `context_str` holds previous messages of the chat as ready-made lines
+        (see AudioBuffer.get_context_str).
+        Returns a tuple of (summary, response) or None if failed.
+        """
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            prefix = f"Previous context:\n{context_str}\n\n" if context_str else ""
+            response = await self._create_chat_completion(
                 messages=[
-                    {
-                        "role": "system",
-                        "content": """
-                        You are an expert at summarizing spoken conversations. Your task is to create a clear, concise summary of audio transcripts while:
-
-                        1. Capturing the essential meaning and key points
-                        2. Maintaining the original tone and language of the speaker
-                        3. Preserving important details, numbers, or specific references
-                        4. Keeping the summary to 2-3 sentences maximum
-                        5. Using natural, conversational language that reflects spoken communication
-
-                        Remember this is transcribed speech, so focus on the core message rather than exact wording. If the transcript contains filler words or speech artifacts, distill the actual meaning."""
-                        f"The detected language of this audio is: {language}",
-                    },
-                    {"role": "user", "content": transcription},
+                    {"role": "system", "content": _SUMMARY_SYSTEM_TMPL % language},
+                    {"role": "user", "content": f"{prefix}Current message:\n{transcription}"},
                 ],
+                response_format=_SUMMARY_RESPONSE_FORMAT,
             )
-            summary = response.choices[0].message.content
-            logging.info(f"Successfully generated summary in {language}")
-            return summary
+            result = json.loads(response.choices[0].message.content)
+            summary = result.get("summary") if isinstance(result, dict) else None
+            topics = result.get("topics") if isinstance(result, dict) else None
+            # The schema does not rule out an empty summary or topic list
+            if not (
+                isinstance(summary, str)
+                and summary.strip()
+                and isinstance(topics, list)
+                and topics
+                and all(isinstance(topic, str) and topic.strip() for topic in topics)
+            ):
+                logger.error("Unexpected summary output: %s", result)
+                return None
+
+            logger.info("Successfully generated summary and topics in %s", language)
+            return summary, "\n".join(f"- {topic}" for topic in topics)
 
         except Exception as e:
-            logging.error(f"Error summarizing transcription: {str(e)}", exc_info=True)
+            logger.error("Error summarizing transcription: %s", e, exc_info=True)
             return None
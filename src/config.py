@@ -1,19 +1,66 @@
 import os
+from dataclasses import dataclass, field
+from typing import Optional
 
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
 
-# Bot Configuration
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-if not TELEGRAM_BOT_TOKEN:
-    raise ValueError("TELEGRAM_BOT_TOKEN not found in environment variables")
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Bot configuration, read from the environment once at startup."""
 
-# OpenAI Configuration
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY not found in environment variables")
+    # Bot Configuration
+    telegram_bot_token: str = field(repr=False)
 
-# Audio Buffer Configuration
-MAX_AUDIO_HISTORY = 2  # Number of previous audio messages to keep in context
+    # OpenAI Configuration
+    openai_api_key: str = field(repr=False)
+
+    # OpenAI Rate Limits (Whisper and chat completions have separate quotas).
+    # Defaults fit a low usage tier; raise them to match the account's limits.
+    openai_max_concurrency: int  # Maximum in-flight requests per endpoint
+    whisper_requests_per_second: float
+    chat_requests_per_second: float
+
+    # Webhook Configuration. Without a public URL the bot falls back to polling.
+    webhook_url: Optional[str] = None  # Public HTTPS URL Telegram sends updates to
+    webhook_port: int = 8443  # Local port the webhook server listens on
+    webhook_secret_token: Optional[str] = field(default=None, repr=False)
+
+    # Audio Buffer Configuration
+    max_audio_history: int = 3  # Number of previous audio messages to keep in context
+
+    # Result Cache Configuration
+    result_cache_ttl_seconds: int = 24 * 60 * 60  # How long a repeat voice message is answered from cache
+
+    @classmethod
+    def load(cls) -> "Settings":
+        """Load settings from environment variables and the .env file."""
+        load_dotenv()
+
+        telegram_bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+        if not telegram_bot_token:
+            raise ValueError("TELEGRAM_BOT_TOKEN not found in environment variables")
+
+        openai_api_key = os.getenv("OPENAI_API_KEY")
+        if not openai_api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+
+        # Without a secret token anyone who finds the webhook URL can post
+        # forged updates to it
+        webhook_url = os.getenv("WEBHOOK_URL") or None
+        webhook_secret_token = os.getenv("WEBHOOK_SECRET_TOKEN") or None
+        if webhook_url and not webhook_secret_token:
+            raise ValueError("WEBHOOK_SECRET_TOKEN is required when WEBHOOK_URL is set")
+
+        return cls(
+            telegram_bot_token=telegram_bot_token,
+            openai_api_key=openai_api_key,
+            openai_max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "10")),
+            whisper_requests_per_second=float(
+                os.getenv("WHISPER_REQUESTS_PER_SECOND", "0.8")
+            ),
+            chat_requests_per_second=float(os.getenv("CHAT_REQUESTS_PER_SECOND", "8")),
+            webhook_url=webhook_url,
+            webhook_port=int(os.getenv("PORT", "8443")),
+            webhook_secret_token=webhook_secret_token,
+        )
@@ -1,52 +1,163 @@
 # src/main.py
 import logging
 import os
+from urllib.parse import urlparse
 
-from dotenv import load_dotenv
-from openai import OpenAI
-from telegram.ext import Application, MessageHandler, filters
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from telegram.ext import (
+    AIORateLimiter,
+    Application,
+    CommandHandler,
+    MessageHandler,
+    filters,
+)
+from telegram.request import HTTPXRequest
 
 from agents.audio_buffer import AudioBuffer
 from agents.audio_processor import AudioProcessor
+from agents.cache import ResultCache
+from agents.digest_handler import DigestCommandHandler
 from agents.message_handler import VoiceMessageHandler  # Updated import
+from agents.rate_limiter import RateLimiter
 from agents.responder import Responder
 from agents.summarizer import Summarizer
+from config import Settings
+
+# Size of the pooled keep-alive connections to api.telegram.org. The library
+# default is a single connection, which serializes every bot API call.
+TELEGRAM_CONNECTION_POOL_SIZE = 32
+
+# Pooled connections to api.openai.com, shared by every transcription and
+# chat completion. HTTP/2 multiplexes concurrent requests over them.
+OPENAI_MAX_CONNECTIONS = 128
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = 64
 
-# Load environment variables
-load_dotenv()
-TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Number of updates processed at the same time, so a long voice message
+# pipeline does not hold back updates from other chats.
+MAX_CONCURRENT_UPDATES = 32
 
 # Configure logging
 logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    # Replace any handler a dependency installed on import, so this format
+    # and level are the ones that apply
+    force=True,
 )
+logger = logging.getLogger(__name__)
 
 
 def main():
     """Start the bot."""
     try:
-        # Initialize OpenAI client
-        openai_client = OpenAI(
-            api_key=OPENAI_API_KEY,
+        settings = Settings.load()
+
+        # Initialize OpenAI client on a shared HTTP/2 connection pool. The SDK
+        # retries connection errors, timeouts, 408/409/429 and 5xx responses
+        # (honoring Retry-After) and fails fast on everything else. A chat
+        # completion attempt times out well inside the handler's 30 s analysis
+        # budget, so a stalled request is retried instead of using it all up.
+        # Transcriptions set their own, longer timeout (see Summarizer).
+        openai_http_client = DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=90,
+            ),
+        )
+        openai_client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            http_client=openai_http_client,
+            max_retries=3,
+            timeout=httpx.Timeout(20.0, connect=5.0),
+        )
+
+        # Shared rate limiters, one per OpenAI endpoint
+        transcription_limiter = RateLimiter(
+            settings.whisper_requests_per_second, settings.openai_max_concurrency
+        )
+        chat_limiter = RateLimiter(
+            settings.chat_requests_per_second, settings.openai_max_concurrency
         )
 
         # Initialize components
         audio_processor = AudioProcessor()
-        audio_buffer = AudioBuffer()
-        summarizer = Summarizer(openai_client)
+        audio_buffer = AudioBuffer(context_size=settings.max_audio_history)
+        summarizer = Summarizer(openai_client, transcription_limiter, chat_limiter)
         responder = Responder(openai_client)
+        result_cache = ResultCache(settings.result_cache_ttl_seconds)
 
         # Initialize voice message handler with all components
         voice_handler = VoiceMessageHandler(  # Updated class name
             audio_processor=audio_processor,
             audio_buffer=audio_buffer,
             summarizer=summarizer,
+            result_cache=result_cache,
+        )
+        digest_handler = DigestCommandHandler(
+            audio_buffer=audio_buffer,
             responder=responder,
         )
 
+        async def warm_up(_: Application) -> None:
+            """
+            Open the OpenAI connection and check the API key with a 1-token
+            completion before the first voice message arrives, and report the
+            account's chat rate limits.
+            """
+            try:
+                raw = await openai_client.chat.completions.with_raw_response.create(
+                    model="gpt-4o-mini",
+                    messages=[{"role": "user", "content": "."}],
+                    max_tokens=1,
+                )
+            except Exception as e:
+                logger.warning("Could not warm up OpenAI client: %s", e)
+                return
+
+            requests_per_minute = raw.headers.get("x-ratelimit-limit-requests")
+            logger.info(
+                "OpenAI client warmed up (chat limits: %s requests/min, %s tokens/min)",
+                requests_per_minute,
+                raw.headers.get("x-ratelimit-limit-tokens"),
+            )
+            if (
+                requests_per_minute
+                and requests_per_minute.isdigit()
+                and settings.chat_requests_per_second * 60 > int(requests_per_minute)
+            ):
+                logger.warning(
+                    "CHAT_REQUESTS_PER_SECOND=%s exceeds the account limit of %s requests/min",
+                    settings.chat_requests_per_second,
+                    requests_per_minute,
+                )
+
+        async def cancel_pending_digests(_: Application) -> None:
+            """Stop polling digest batches so shutdown does not wait for them."""
+            await digest_handler.cancel_pending()
+
+        async def close_openai_client(_: Application) -> None:
+            """Close the pooled OpenAI connections once the bot has stopped."""
+            await openai_http_client.aclose()
+
         # Create application instance
-        application = Application.builder().token(TOKEN).build()
+        application = (
+            Application.builder()
+            .token(settings.telegram_bot_token)
+            .request(HTTPXRequest(connection_pool_size=TELEGRAM_CONNECTION_POOL_SIZE))
+            .get_updates_request(HTTPXRequest())
+            .concurrent_updates(MAX_CONCURRENT_UPDATES)
+            # Throttles bot API calls to Telegram's limits (30/s overall,
+            # 20/min per group) so replies to different chats do not queue
+            # behind each other, and retries calls rejected with RetryAfter
+            .rate_limiter(AIORateLimiter(max_retries=2))
+            .post_init(warm_up)
+            .post_stop(cancel_pending_digests)
+            .post_shutdown(close_openai_client)
+            .build()
+        )
 
         # Add voice message handler
         application.add_handler(
@@ -55,12 +166,28 @@ def main():
             )
         )
 
-        # Start polling
-        logging.info("Bot started")
-        application.run_polling()
+        # Add /digest command handler
+        application.add_handler(
+            CommandHandler("digest", digest_handler.handle_digest_command)
+        )
+
+        # Receive updates through a webhook when a public URL is configured, so
+        # Telegram pushes them instead of the bot polling getUpdates
+        if settings.webhook_url:
+            logger.info("Bot started (webhook)")
+            application.run_webhook(
+                listen="0.0.0.0",
+                port=settings.webhook_port,
+                url_path=urlparse(settings.webhook_url).path.lstrip("/"),
+                webhook_url=settings.webhook_url,
+                secret_token=settings.webhook_secret_token,
+            )
+        else:
+            logger.info("Bot started (polling)")
+            application.run_polling()
 
     except Exception as e:
-        logging.error(f"Error starting bot: {str(e)}", exc_info=True)
+        logger.error("Error starting bot: %s", e, exc_info=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from telegram import Message
+
+logger = logging.getLogger(__name__)
+
+
+class StatusUpdater:
+    """
+    Coalesces edits of a status message. Progress updates are sent at most
+    once per `min_interval` seconds and only the latest one is kept; the final
+    text is sent as soon as any edit already in flight has completed. If it
+    cannot be edited in, it is sent as a reply instead; progress updates that
+    fail are only logged.
+    Edits run as tasks in the given task group, so leaving the group waits for
+    them and an error in the caller cancels them.
+    """
+
+    def __init__(
+        self,
+        message: Message,
+        task_group: asyncio.TaskGroup,
+        min_interval: float = 0.4,
+    ):
+        self._message = message
+        self._task_group = task_group
+        self._min_interval = min_interval
+        self._shown = message.text
+        self._pending: Optional[str] = None
+        self._last_edit = float("-inf")
+        self._final = False
+        self._finished = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, text: str) -> None:
+        """Show a progress update, possibly merged with later ones."""
+        if not self._final:
+            self._schedule(text)
+
+    def finish(self, text: str) -> None:
+        """Show the final text. Later updates are ignored."""
+        self._final = True
+        self._finished.set()
+        self._schedule(text)
+
+    def _schedule(self, text: str) -> None:
+        self._pending = text
+        if self._task is None or self._task.done():
+            self._task = self._task_group.create_task(self._flush())
+
+    async def _flush(self) -> None:
+        while self._pending is not None:
+            delay = self._last_edit + self._min_interval - time.monotonic()
+            if delay > 0 and not self._final:
+                # Wait out the interval, unless the final text arrives first
+                try:
+                    await asyncio.wait_for(self._finished.wait(), delay)
+                except TimeoutError:
+                    pass
+
+            # Once finish() is called, the pending text can only be the final one
+            final = self._final
+            text, self._pending = self._pending, None
+            if text == self._shown:
+                continue
+            await self._edit(text, final)
+            self._shown = text
+            self._last_edit = time.monotonic()
+
+    async def _edit(self, text: str, final: bool) -> None:
+        """
+        Edit the message. A failed progress update is logged; a failed final
+        edit falls back to replying with the text, and raises if that fails too.
+        """
+        try:
+            await self._message.edit_text(text)
+        except Exception as e:
+            # Telegram rejects an edit to the text already shown with a BadRequest.
+            # Matched by its text so this module does not import telegram at runtime.
+            if "message is not modified" in str(e).lower():
+                logger.debug("Status message already up to date")
+                return
+            if not final:
+                logger.error("Error updating status message: %s", e)
+                return
+            logger.warning("Error showing final status, replying instead: %s", e)
+            await self._message.reply_text(text)
@@ -3,10 +3,12 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 
+logger = logging.getLogger(__name__)
+
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle errors."""
-    logging.error(f"Error occurred: {context.error}")
+    logger.error("Error occurred: %s", context.error)
     if update:
         await update.message.reply_text(
             "Sorry, something went wrong processing your message."
@@ -0,0 +1,64 @@
+import unittest
+
+from agents.audio_buffer import AudioBuffer
+
+
+def add_transcribed(buffer, chat_id, message_id, transcription, summary=None):
+    key = buffer.add_entry(
+        message_id=message_id, chat_id=chat_id, user_id=1, file_id=f"file-{message_id}"
+    )
+    buffer.update_transcription(key, transcription, summary)
+    return key
+
+
+class AudioBufferContextTest(unittest.TestCase):
+    def test_context_keeps_latest_lines_oldest_first(self):
+        buffer = AudioBuffer(context_size=2)
+        for message_id in range(3):
+            add_transcribed(buffer, 10, message_id, f"message {message_id}")
+        add_transcribed(buffer, 20, 0, "other chat")
+
+        self.assertEqual(buffer.get_context_str(10), "user: message 1\nuser: message 2")
+        self.assertEqual(buffer.get_context_str(20), "user: other chat")
+
+    def test_summary_stands_in_for_transcription(self):
+        buffer = AudioBuffer()
+        add_transcribed(buffer, 10, 0, "a long transcription", summary="short")
+
+        self.assertEqual(buffer.get_context_str(10), "user: short")
+
+    def test_updating_entry_again_replaces_its_line(self):
+        buffer = AudioBuffer()
+        key = add_transcribed(buffer, 10, 0, "first")
+        add_transcribed(buffer, 10, 1, "second")
+        buffer.update_transcription(key, "first again")
+
+        self.assertEqual(buffer.get_context_str(10), "user: first again\nuser: second")
+
+    def test_cleanup_drops_context_lines(self):
+        buffer = AudioBuffer()
+        key = add_transcribed(buffer, 10, 0, "hi")
+        buffer.update_transcription(key, "hi again")
+
+        self.assertEqual(buffer.cleanup_old_entries(max_age_hours=0), 1)
+        self.assertEqual(buffer.get_context_str(10), "")
+        self.assertEqual(buffer._context, {})
+
+    def test_evicted_entry_drops_its_context_line(self):
+        buffer = AudioBuffer(max_size=2)
+        add_transcribed(buffer, 10, 0, "first")
+        add_transcribed(buffer, 10, 1, "second")
+        add_transcribed(buffer, 20, 0, "other chat")
+
+        self.assertEqual(buffer.get_context_str(10), "user: second")
+
+    def test_readded_entry_drops_its_old_line(self):
+        buffer = AudioBuffer()
+        add_transcribed(buffer, 10, 0, "first")
+        buffer.add_entry(message_id=0, chat_id=10, user_id=1, file_id="file-0")
+
+        self.assertEqual(buffer.get_context_str(10), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
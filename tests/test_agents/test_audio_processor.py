@@ -0,0 +1,36 @@
+import unittest
+
+from agents.audio_processor import AudioProcessor
+
+
+class WhisperFilenameTest(unittest.TestCase):
+    def test_accepted_types_keep_their_format(self):
+        cases = {
+            "audio/ogg": "voice.ogg",
+            "audio/mpeg": "voice.mp3",
+            "audio/x-m4a": "voice.m4a",
+            "audio/wav": "voice.wav",
+            "audio/webm": "voice.webm",
+            "audio/flac": "voice.flac",
+        }
+        for mime_type, filename in cases.items():
+            with self.subTest(mime_type=mime_type):
+                self.assertEqual(AudioProcessor.whisper_filename(mime_type), filename)
+
+    def test_parameters_and_case_are_ignored(self):
+        self.assertEqual(
+            AudioProcessor.whisper_filename("Audio/OGG; codecs=opus"), "voice.ogg"
+        )
+
+    def test_missing_type_is_taken_as_telegram_voice_note(self):
+        self.assertEqual(AudioProcessor.whisper_filename(None), "voice.ogg")
+        self.assertEqual(AudioProcessor.whisper_filename(""), "voice.ogg")
+
+    def test_other_types_need_conversion(self):
+        for mime_type in ("audio/amr", "audio/aac", "video/quicktime"):
+            with self.subTest(mime_type=mime_type):
+                self.assertIsNone(AudioProcessor.whisper_filename(mime_type))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from unittest import mock
+
+from agents.cache import CachedResult, ResultCache
+
+
+class ResultCacheTest(unittest.TestCase):
+    def test_entries_expire_after_ttl(self):
+        cache = ResultCache(ttl_seconds=60)
+        result = CachedResult("hello", "english")
+
+        with mock.patch("agents.cache.time.monotonic", return_value=1000.0):
+            cache.put("key", result)
+        with mock.patch("agents.cache.time.monotonic", return_value=1059.0):
+            self.assertIs(cache.get("key"), result)
+        with mock.patch("agents.cache.time.monotonic", return_value=1060.0):
+            self.assertIsNone(cache.get("key"))
+        with mock.patch("agents.cache.time.monotonic", return_value=1000.0):
+            # The expired entry was removed, not just hidden
+            self.assertIsNone(cache.get("key"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResultCache(ttl_seconds=60, max_size=2)
+        first = CachedResult("first", "english")
+        second = CachedResult("second", "english")
+        third = CachedResult("third", "english")
+
+        cache.put("first", first)
+        cache.put("second", second)
+        cache.get("first")  # "second" is now the least recently used
+        cache.put("third", third)
+
+        self.assertIs(cache.get("first"), first)
+        self.assertIsNone(cache.get("second"))
+        self.assertIs(cache.get("third"), third)
+
+    def test_keys_are_per_chat(self):
+        cache = ResultCache(ttl_seconds=60)
+        result = CachedResult("hello", "english", "summary", "- topic")
+
+        cache.put((1, "file"), result)
+
+        self.assertIs(cache.get((1, "file")), result)
+        self.assertIsNone(cache.get((2, "file")))
+
+    def test_reply_falls_back_to_transcription(self):
+        self.assertEqual(CachedResult("hello", "english").reply, "hello")
+        self.assertEqual(
+            CachedResult("hello", "english", "summary", "- topic").reply, "- topic"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
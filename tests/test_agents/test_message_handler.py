@@ -0,0 +1,156 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+
+from agents.audio_buffer import AudioBuffer
+from agents.cache import ResultCache
+from agents.message_handler import VoiceMessageHandler
+from agents.rate_limiter import RateLimiter
+from agents.summarizer import Summarizer
+
+
+class FakeAudioProcessor:
+    """Serves the same audio for every voice message without Telegram."""
+
+    def __init__(self):
+        self.downloads = 0
+
+    async def download_voice_message(self, update, context):
+        self.downloads += 1
+        return b"audio"
+
+    @staticmethod
+    def whisper_filename(mime_type):
+        return "voice.ogg"
+
+
+class FakeOpenAI:
+    """Counts transcriptions and answers every completion with one summary."""
+
+    def __init__(self, text):
+        self.transcriptions = 0
+        self.completions = 0
+        self.audio = SimpleNamespace(
+            transcriptions=SimpleNamespace(create=self._transcribe)
+        )
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+        self._text = text
+
+    def with_options(self, **kwargs):
+        return self
+
+    async def _transcribe(self, **kwargs):
+        self.transcriptions += 1
+        return SimpleNamespace(text=self._text, language="english")
+
+    async def _complete(self, **kwargs):
+        self.completions += 1
+        content = json.dumps({"summary": "A summary.", "topics": ["a topic"]})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+        )
+
+
+class FakeMessage:
+    """A message that records what the bot sends and edits."""
+
+    def __init__(self, sent, text=None, chat_id=None, message_id=None, voice=None):
+        self.sent = sent
+        self.text = text
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.voice = voice
+        self.from_user = SimpleNamespace(id=1)
+
+    async def reply_text(self, text):
+        self.sent.append(text)
+        return FakeMessage(self.sent, text=text)
+
+    async def edit_text(self, text):
+        self.sent.append(text)
+        self.text = text
+
+
+def voice_update(sent, chat_id, message_id, file_unique_id="file"):
+    voice = SimpleNamespace(
+        file_id=f"{file_unique_id}-{chat_id}",
+        file_unique_id=file_unique_id,
+        duration=3,
+        file_size=1000,
+        mime_type="audio/ogg",
+    )
+    message = FakeMessage(sent, chat_id=chat_id, message_id=message_id, voice=voice)
+    return SimpleNamespace(message=message)
+
+
+class HandlerTestCase(unittest.IsolatedAsyncioTestCase):
+    def make_handler(self, text):
+        self.client = FakeOpenAI(text)
+        self.audio_processor = FakeAudioProcessor()
+        limiter = RateLimiter(requests_per_second=1000, max_concurrency=10)
+        return VoiceMessageHandler(
+            audio_processor=self.audio_processor,
+            audio_buffer=AudioBuffer(),
+            summarizer=Summarizer(self.client, limiter, limiter),
+            result_cache=ResultCache(ttl_seconds=60),
+        )
+
+
+class TranscriptionCacheTest(HandlerTestCase):
+    async def test_same_voice_note_in_two_chats_is_transcribed_once(self):
+        handler = self.make_handler(" ".join(["word"] * 150))
+        sent = []
+
+        await handler.handle_voice_message(voice_update(sent, chat_id=1, message_id=1), None)
+        await handler.handle_voice_message(voice_update(sent, chat_id=2, message_id=1), None)
+
+        self.assertEqual(self.client.transcriptions, 1)
+        self.assertEqual(self.audio_processor.downloads, 1)
+        # The summary depends on the chat, so each chat gets its own
+        self.assertEqual(self.client.completions, 2)
+
+    async def test_concurrent_copies_are_transcribed_once(self):
+        handler = self.make_handler(" ".join(["word"] * 150))
+        sent = []
+
+        await asyncio.gather(
+            *(
+                handler.handle_voice_message(
+                    voice_update(sent, chat_id=chat_id, message_id=1), None
+                )
+                for chat_id in (1, 2, 3)
+            )
+        )
+
+        self.assertEqual(self.client.transcriptions, 1)
+
+
+class ShortMessageTest(HandlerTestCase):
+    async def handle(self, text):
+        handler = self.make_handler(text)
+        sent = []
+        await handler.handle_voice_message(voice_update(sent, chat_id=1, message_id=1), None)
+        return sent[-1]
+
+    async def test_short_message_is_sent_as_is(self):
+        text = "Running late, see you at eight."
+        self.assertEqual(await self.handle(text), text)
+        self.assertEqual(self.client.completions, 0)
+
+    async def test_long_message_is_summarized(self):
+        self.assertEqual(await self.handle(" ".join(["word"] * 100)), "- a topic")
+        self.assertEqual(self.client.completions, 1)
+
+    async def test_long_message_without_spaces_is_summarized(self):
+        self.assertEqual(await self.handle("今日は会議があります。" * 60), "- a topic")
+        self.assertEqual(self.client.completions, 1)
+
+    async def test_short_message_without_spaces_is_sent_as_is(self):
+        text = "今日は会議があります。" * 5
+        self.assertEqual(await self.handle(text), text)
+        self.assertEqual(self.client.completions, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
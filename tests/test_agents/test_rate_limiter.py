@@ -0,0 +1,57 @@
+import asyncio
+import unittest
+
+from agents.rate_limiter import RateLimiter
+
+
+class RateLimiterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_request_starts_are_spaced_out(self):
+        limiter = RateLimiter(requests_per_second=20, max_concurrency=10)
+        loop = asyncio.get_running_loop()
+        starts = []
+
+        async def request():
+            async with limiter:
+                starts.append(loop.time())
+
+        await asyncio.gather(*(request() for _ in range(4)))
+
+        gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+        for gap in gaps:
+            # Allow for the loop clock's resolution
+            self.assertGreaterEqual(gap, 0.05 - 0.005)
+
+    async def test_in_flight_requests_are_capped(self):
+        limiter = RateLimiter(requests_per_second=1000, max_concurrency=2)
+        in_flight = 0
+        max_in_flight = 0
+
+        async def request():
+            nonlocal in_flight, max_in_flight
+            async with limiter:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+
+        await asyncio.gather(*(request() for _ in range(6)))
+
+        self.assertEqual(max_in_flight, 2)
+
+    async def test_cancelled_wait_releases_slot(self):
+        limiter = RateLimiter(requests_per_second=1, max_concurrency=1)
+        async with limiter:
+            pass
+
+        # The next start is a second away; cancel while waiting for it
+        waiter = asyncio.create_task(limiter.__aenter__())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+
+        self.assertFalse(limiter._semaphore.locked())
+
+
+if __name__ == "__main__":
+    unittest.main()
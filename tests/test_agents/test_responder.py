@@ -0,0 +1,100 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from agents.responder import Responder
+
+
+class FakeOpenAI:
+    """Runs one digest batch through the given statuses, failing some polls."""
+
+    def __init__(self, statuses, failed_polls=0):
+        self.statuses = list(statuses)
+        self.failed_polls = failed_polls
+        self.polls = 0
+        self.cancelled = []
+        self.deleted = []
+        self.files = SimpleNamespace(
+            create=self._create_file, content=self._content, delete=self._delete
+        )
+        self.batches = SimpleNamespace(
+            create=self._create_batch, retrieve=self._retrieve, cancel=self._cancel
+        )
+
+    async def _create_file(self, **kwargs):
+        return SimpleNamespace(id="input-file")
+
+    async def _create_batch(self, **kwargs):
+        return self._batch("validating")
+
+    async def _retrieve(self, batch_id):
+        self.polls += 1
+        if self.polls <= self.failed_polls:
+            raise ConnectionError("connection reset")
+        return self._batch(self.statuses.pop(0))
+
+    async def _cancel(self, batch_id):
+        self.cancelled.append(batch_id)
+
+    async def _content(self, file_id):
+        body = {"choices": [{"message": {"content": "- a topic"}}]}
+        return SimpleNamespace(text=json.dumps({"response": {"body": body}}) + "\n")
+
+    async def _delete(self, file_id):
+        self.deleted.append(file_id)
+
+    @staticmethod
+    def _batch(status):
+        completed = status == "completed"
+        return SimpleNamespace(
+            id="batch",
+            status=status,
+            output_file_id="output-file" if completed else None,
+            error_file_id=None,
+        )
+
+
+@mock.patch("agents.responder._BATCH_POLL_SECONDS", 0)
+class GenerateDigestTest(unittest.IsolatedAsyncioTestCase):
+    async def test_failed_polls_are_retried_until_final_status(self):
+        client = FakeOpenAI(["in_progress", "completed"], failed_polls=2)
+
+        with self.assertLogs("agents.responder", "WARNING"):
+            digest = await Responder(client).generate_digest(["hello"])
+
+        self.assertEqual(digest, "- a topic")
+        self.assertEqual(client.polls, 4)
+
+    async def test_files_are_deleted_once_read(self):
+        client = FakeOpenAI(["completed"])
+
+        await Responder(client).generate_digest(["hello"])
+
+        self.assertEqual(client.deleted, ["input-file", "output-file"])
+
+    async def test_input_file_is_deleted_when_batch_fails(self):
+        client = FakeOpenAI(["failed"])
+
+        with self.assertLogs("agents.responder", "ERROR"):
+            digest = await Responder(client).generate_digest(["hello"])
+
+        self.assertIsNone(digest)
+        self.assertEqual(client.deleted, ["input-file"])
+
+    async def test_cancelled_digest_cancels_batch(self):
+        client = FakeOpenAI(["in_progress"] * 1000)
+
+        task = asyncio.create_task(Responder(client).generate_digest(["hello"]))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        self.assertEqual(client.cancelled, ["batch"])
+        self.assertEqual(client.deleted, ["input-file"])
+
+
+if __name__ == "__main__":
+    unittest.main()
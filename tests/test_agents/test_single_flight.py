@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+
+from agents.single_flight import SingleFlight
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_result(self):
+        single_flight = SingleFlight()
+        release = asyncio.Event()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "result"
+
+        tasks = [asyncio.create_task(single_flight.run("key", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+
+        self.assertEqual(await asyncio.gather(*tasks), ["result"] * 3)
+        self.assertEqual(calls, 1)
+
+    async def test_exception_is_shared(self):
+        single_flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            raise ValueError("failed")
+
+        tasks = [asyncio.create_task(single_flight.run("key", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    async def test_follower_reruns_work_when_leader_is_cancelled(self):
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                await asyncio.Event().wait()  # The leader never finishes
+            return "result"
+
+        leader = asyncio.create_task(single_flight.run("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.run("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        self.assertEqual(await follower, "result")
+        self.assertEqual(calls, 2)
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+
+    async def test_cancelled_follower_does_not_cancel_leader(self):
+        single_flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "result"
+
+        leader = asyncio.create_task(single_flight.run("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.run("key", work))
+        await asyncio.sleep(0)
+        follower.cancel()
+        release.set()
+
+        self.assertEqual(await leader, "result")
+        with self.assertRaises(asyncio.CancelledError):
+            await follower
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import unittest
+from types import SimpleNamespace
+
+from agents.rate_limiter import RateLimiter
+from agents.summarizer import Summarizer
+
+
+class FakeOpenAI:
+    """Records the options and arguments of each request."""
+
+    def __init__(self, options=None):
+        self.options = options or {}
+        self.requests = []
+        self.completion = None
+        self.audio = SimpleNamespace(
+            transcriptions=SimpleNamespace(create=self._transcribe)
+        )
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+
+    def with_options(self, **options):
+        client = FakeOpenAI({**self.options, **options})
+        client.requests = self.requests
+        client.completion = self.completion
+        return client
+
+    async def _transcribe(self, **kwargs):
+        self.requests.append((self.options, kwargs))
+        return SimpleNamespace(text="hello", language="english")
+
+    async def _complete(self, **kwargs):
+        self.requests.append((self.options, kwargs))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.completion))]
+        )
+
+
+def make_summarizer(client):
+    limiter = RateLimiter(requests_per_second=1000, max_concurrency=10)
+    return Summarizer(client, limiter, limiter)
+
+
+class TranscribeAudioTest(unittest.IsolatedAsyncioTestCase):
+    async def test_transcription_overrides_the_client_timeout(self):
+        client = FakeOpenAI()
+
+        result = await make_summarizer(client).transcribe_audio(b"audio")
+
+        self.assertEqual(result, ("hello", "english"))
+        options, kwargs = client.requests[0]
+        self.assertEqual(kwargs["file"], ("voice.ogg", b"audio"))
+        # Long enough for Whisper on a long note, inside the 45 s stage budget
+        self.assertGreater(options["timeout"], 20)
+        self.assertLess(options["timeout"], 45)
+
+
+
+class SummarizeAndRespondTest(unittest.IsolatedAsyncioTestCase):
+    async def summarize(self, content):
+        client = FakeOpenAI()
+        client.completion = content
+        result = await make_summarizer(client).summarize_and_respond("hello", "english")
+        return result, client.requests[0][1]
+
+    async def test_valid_output_is_returned(self):
+        result, kwargs = await self.summarize(
+            json.dumps({"summary": "A greeting.", "topics": ["greetings", "small talk"]})
+        )
+
+        self.assertEqual(result, ("A greeting.", "- greetings\n- small talk"))
+        self.assertEqual(kwargs["response_format"]["type"], "json_schema")
+
+    async def test_invalid_output_returns_none(self):
+        outputs = [
+            {"summary": "A greeting.", "topics": []},
+            {"summary": "A greeting.", "topics": ["greetings", ""]},
+            {"summary": "A greeting.", "topics": "greetings"},
+            {"summary": 1, "topics": ["greetings"]},
+            {"summary": " ", "topics": ["greetings"]},
+            {"topics": ["greetings"]},
+            ["A greeting."],
+        ]
+        for output in outputs:
+            with self.subTest(output=output), self.assertLogs("agents.summarizer", "ERROR"):
+                result, _ = await self.summarize(json.dumps(output))
+                self.assertIsNone(result)
+
+    async def test_unparsable_output_returns_none(self):
+        for content in ("not json", None):
+            with self.subTest(content=content), self.assertLogs("agents.summarizer", "ERROR"):
+                result, _ = await self.summarize(content)
+                self.assertIsNone(result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import unittest
+from unittest import mock
+
+from config import Settings
+
+_REQUIRED = {"TELEGRAM_BOT_TOKEN": "token", "OPENAI_API_KEY": "key"}
+
+
+@mock.patch("config.load_dotenv", lambda: None)
+class SettingsLoadTest(unittest.TestCase):
+    def load(self, **environ):
+        with mock.patch.dict(os.environ, {**_REQUIRED, **environ}, clear=True):
+            return Settings.load()
+
+    def test_polling_needs_no_webhook_settings(self):
+        settings = self.load()
+
+        self.assertIsNone(settings.webhook_url)
+        self.assertIsNone(settings.webhook_secret_token)
+
+    def test_webhook_requires_secret_token(self):
+        with self.assertRaisesRegex(ValueError, "WEBHOOK_SECRET_TOKEN"):
+            self.load(WEBHOOK_URL="https://example.com/bot")
+        with self.assertRaisesRegex(ValueError, "WEBHOOK_SECRET_TOKEN"):
+            self.load(WEBHOOK_URL="https://example.com/bot", WEBHOOK_SECRET_TOKEN="")
+
+    def test_webhook_with_secret_token(self):
+        settings = self.load(
+            WEBHOOK_URL="https://example.com/bot", WEBHOOK_SECRET_TOKEN="secret", PORT="8080"
+        )
+
+        self.assertEqual(settings.webhook_url, "https://example.com/bot")
+        self.assertEqual(settings.webhook_secret_token, "secret")
+        self.assertEqual(settings.webhook_port, 8080)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+
+from telegram_utils.status_updater import StatusUpdater
+
+
+class FakeMessage:
+    """Records the edits and replies made to a status message."""
+
+    def __init__(self, text="start", edit_error=None):
+        self.text = text
+        self.edit_error = edit_error
+        self.edits = []
+        self.replies = []
+
+    async def edit_text(self, text):
+        await asyncio.sleep(0.01)
+        if self.edit_error is not None:
+            raise self.edit_error
+        self.edits.append(text)
+
+    async def reply_text(self, text):
+        self.replies.append(text)
+
+
+class StatusUpdaterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_updates_within_interval_are_coalesced(self):
+        message = FakeMessage()
+        async with asyncio.TaskGroup() as task_group:
+            status = StatusUpdater(message, task_group, min_interval=0.1)
+            status.update("first")
+            await asyncio.sleep(0.05)  # "first" is being sent
+            status.update("second")
+            status.update("third")
+            await asyncio.sleep(0.2)
+            status.finish("done")
+
+        self.assertEqual(message.edits, ["first", "third", "done"])
+
+    async def test_finish_skips_pending_updates_and_comes_last(self):
+        message = FakeMessage()
+        async with asyncio.TaskGroup() as task_group:
+            status = StatusUpdater(message, task_group, min_interval=10)
+            status.update("first")
+            await asyncio.sleep(0.05)
+            status.update("second")
+            status.finish("done")
+            status.update("late")
+
+        # The final text does not wait out the interval
+        self.assertEqual(message.edits, ["first", "done"])
+
+    async def test_unchanged_text_is_not_sent(self):
+        message = FakeMessage(text="start")
+        async with asyncio.TaskGroup() as task_group:
+            StatusUpdater(message, task_group).finish("start")
+
+        self.assertEqual(message.edits, [])
+
+    async def test_failed_final_edit_falls_back_to_reply(self):
+        message = FakeMessage(edit_error=Exception("Message to edit not found"))
+        with self.assertLogs("telegram_utils.status_updater", "WARNING"):
+            async with asyncio.TaskGroup() as task_group:
+                status = StatusUpdater(message, task_group)
+                status.update("progress")
+                await asyncio.sleep(0.05)
+                status.finish("done")
+
+        self.assertEqual(message.replies, ["done"])
+
+    async def test_not_modified_final_edit_is_not_resent(self):
+        message = FakeMessage(edit_error=Exception("Message is not modified"))
+        async with asyncio.TaskGroup() as task_group:
+            StatusUpdater(message, task_group).finish("done")
+
+        self.assertEqual(message.replies, [])
+
+
+if __name__ == "__main__":
+    unittest.main()